@@ -1,38 +1,85 @@
 import backtrader as bt
-import datetime
-import pandas as pd
-import math
 import os
+import numpy as np
+from fastcore import fast_crossover, sma_cross_simulate
 from metrics import compute_metrics
-from utils import prepare_csv
-from plotting import plot_candlestick_with_trades
+from utils import load_ohlcv_csv, prepare_csv
+from vector_backtest import opened_trades, sma_cross_vectorized
+
+
+def _nop(strat):
+    pass
+
+
+def _buy(strat):
+    strat.buy()
+
+
+def _sell(strat):
+    strat.sell()
+
+
+def _close_buy(strat):
+    strat.close()
+    strat.buy()
+
+
+def _close_sell(strat):
+    strat.close()
+    strat.sell()
 
 
 class SmaCrossStrategy(bt.Strategy):
     params = dict(short_period=10, long_period=20)
 
+    # Action per (position sign, crossover sign), both shifted to 0..2:
+    # 0 = nop, 1 = buy, 2 = sell, 3 = close + buy, 4 = close + sell
+    _ACTION = np.array([
+        [0, 0, 3],  # short
+        [2, 0, 1],  # flat
+        [4, 0, 0],  # long
+    ], dtype=np.int8)
+    _DISPATCH = (_nop, _buy, _sell, _close_buy, _close_sell)
+
     def __init__(self):
-        self.sma_short = bt.ind.SMA(period=self.p.short_period)
-        self.sma_long = bt.ind.SMA(period=self.p.long_period)
-        self.crossover = bt.ind.CrossOver(self.sma_short, self.sma_long)
+        # equity_curve e o crossover de start() leem o feed inteiro
+        if not self.data.buflen():
+            raise ValueError(
+                "SmaCrossStrategy requer dados pré-carregados: use "
+                "bt.Cerebro(preload=True) (o padrão)"
+            )
+        # Crossover is precomputed in start(); no indicators means no
+        # automatic minperiod, so next() skips the SMA warm-up itself
+        self._warmup = max(self.p.short_period, self.p.long_period)
         self.trades = []  # Track trades for plotting
-        self.equity_curve = []  # Track portfolio value for metrics
+        # Track portfolio value for metrics (data is preloaded, so the
+        # number of bars is known up front)
+        self.equity_curve = np.empty(self.data.buflen(), dtype=np.float64)
+        self._idx = 0
+        # Bound once; with no args the broker returns its cached value
+        self._getvalue = self.broker.getvalue
+
+    def start(self):
+        self._cross = fast_crossover(
+            self.data.close.array, self.p.short_period, self.p.long_period
+        )
 
     def next(self):
+        if len(self) <= self._warmup:
+            return
+
         # Track equity curve
-        self.equity_curve.append(self.broker.getvalue())
-
-        if self.position.size == 0:
-            if self.crossover > 0:
-                self.buy()
-            elif self.crossover < 0:
-                self.sell()
-        elif self.position.size > 0 and self.crossover < 0:
-            self.close()
-            self.sell()
-        elif self.position.size < 0 and self.crossover > 0:
-            self.close()
-            self.buy()
+        self.equity_curve[self._idx] = self._getvalue()
+        self._idx += 1
+
+        size = self.position.size
+        pos = (size > 0) - (size < 0)
+        cross = int(self._cross[len(self) - 1])
+        self._DISPATCH[self._ACTION[pos + 1, cross + 1]](self)
+
+    def stop(self):
+        # Drop the unused (uninitialized) tail of the preallocated buffer
+        self.equity_curve = self.equity_curve[:self._idx]
 
     def notify_trade(self, trade):
         if trade.justopened:
@@ -45,50 +92,106 @@ class SmaCrossStrategy(bt.Strategy):
 
 
 
-def run_backtest(data_path="data/MES_2023.csv", cash=100000.0):
-    clean_path = prepare_csv(data_path, "data/MES_2023_clean.csv")
-
-    data = bt.feeds.GenericCSVData(
-        dataname=clean_path,
-        dtformat='%Y-%m-%d',
-        timeframe=bt.TimeFrame.Days,
-        openinterest=-1,
-        datetime=0,
-        open=1,
-        high=2,
-        low=3,
-        close=4,
-        volume=5
+def _trades_from_positions(df, pos):
+    """Trade markers (same dicts notify_trade records) from a position path."""
+    dates = df.index
+    opens = df["Open"].to_numpy(dtype=np.float64)
+    return [
+        {
+            'date': dates[i].to_pydatetime(),
+            'type': 'buy' if pos[i] > 0 else 'sell',
+            'price': float(opens[i]),
+        }
+        for i in opened_trades(pos)
+    ]
+
+
+def run_vector(df, cash=100000.0):
+    """
+    Run SmaCrossStrategy as a vectorized NumPy backtest (no bar loop).
+    Returns (trades, equity_curve) in the same shape the strategy tracks.
+    """
+    params = SmaCrossStrategy.params
+    equity, pos = sma_cross_vectorized(
+        df["Close"].to_numpy(dtype=np.float64),
+        df["Open"].to_numpy(dtype=np.float64),
+        params.short_period,
+        params.long_period,
+        cash,
+    )
+    return _trades_from_positions(df, pos), equity[~np.isnan(equity)]
+
+
+def run_fastcore(df, cash=100000.0):
+    """
+    Run SmaCrossStrategy through the compiled kernel instead of Cerebro.
+    Returns (trades, equity_curve) in the same shape the strategy tracks.
+    """
+    params = SmaCrossStrategy.params
+    close = df["Close"].to_numpy(dtype=np.float64)
+    out = sma_cross_simulate(
+        close,
+        df["Open"].to_numpy(dtype=np.float64),
+        fast_crossover(close, params.short_period, params.long_period),
+        max(params.short_period, params.long_period),
+        cash,
     )
+    equity, pos = out[:, 0], out[:, 1]
+    return _trades_from_positions(df, pos), equity[~np.isnan(equity)]
+
+
+def run_cerebro(df, cash=100000.0):
+    data = bt.feeds.PandasData(dataname=df)
 
     cerebro = bt.Cerebro()
     cerebro.broker.setcash(cash)
     cerebro.adddata(data)
     cerebro.addstrategy(SmaCrossStrategy)
 
-    print("Starting Portfolio Value:", cerebro.broker.getvalue())
     results = cerebro.run()
-    print("Final Portfolio Value:", cerebro.broker.getvalue())
-
-    # Get strategy and trades
     strat = results[0]
-    trades = strat.trades
+    return results, strat.trades, strat.equity_curve
 
-    # Load data for plotting
-    df = pd.read_csv(clean_path)
 
-    # Generate clean academic chart
-    plot_candlestick_with_trades(
-        df=df,
-        trades=trades,
-        title="Baseline: Estratégia SMA Crossover (10/20)",
-        output_path="results/baseline/baseline_candlestick.png",
-    )
-
-    compute_metrics(df, results, out_dir="results/baseline", equity_curve=strat.equity_curve)
+def run_backtest(data_path="data/MES_2023.csv", cash=100000.0, engine="vector", plot=False):
+    """
+    engine: "vector" (NumPy, default), "fastcore" (Numba kernel) or
+    "backtrader" (Cerebro event loop). All three take their signal from
+    the same fast_crossover array, so they give the same trades and
+    equity; only "backtrader" returns Cerebro results.
+    """
+    clean_path = prepare_csv(data_path, "data/MES_2023_clean.csv")
 
-    return results, df, trades, strat.equity_curve
+    # Load once: the same frame feeds the simulation, the chart and the metrics
+    df = load_ohlcv_csv(clean_path)
+
+    print("Starting Portfolio Value:", cash)
+    results = None
+    if engine == "vector":
+        trades, equity_curve = run_vector(df, cash)
+    elif engine == "fastcore":
+        trades, equity_curve = run_fastcore(df, cash)
+    elif engine == "backtrader":
+        results, trades, equity_curve = run_cerebro(df, cash)
+    else:
+        raise ValueError(f"Unknown engine: {engine!r}")
+    # no bar past the SMA warm-up means no orders: value is still the cash
+    print("Final Portfolio Value:", equity_curve[-1] if len(equity_curve) else cash)
+
+    if plot:
+        # Generate clean academic chart (matplotlib only loaded when needed)
+        from plotting import plot_candlestick_with_trades
+        plot_candlestick_with_trades(
+            df=df.reset_index(),
+            trades=trades,
+            title="Baseline: Estratégia SMA Crossover (10/20)",
+            output_path="results/baseline/baseline_candlestick.png",
+        )
+
+    compute_metrics(df, results, out_dir="results/baseline", equity_curve=equity_curve)
+
+    return results, df, trades, equity_curve
 
 if __name__ == "__main__":
     os.makedirs("results/baseline", exist_ok=True)
-    run_backtest()
+    run_backtest(plot=True)
@@ -3,23 +3,22 @@
 Script para gerar comparacao entre baseline e enhanced bot.
 Gera a equity curve (curva de capital) comparativa.
 """
+import argparse
+import multiprocessing
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import pandas as pd
 import numpy as np
 import backtrader as bt
 
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
-from baseline_bot import SmaCrossStrategy, run_backtest as run_baseline
-from enchanced_bot import EnhancedSmaCross, run_backtest as run_enhanced
-from utils import prepare_csv
+from baseline_bot import SmaCrossStrategy
+from enchanced_bot import EnhancedSmaCross
+from utils import load_ohlcv_csv, prepare_csv
 
 
 def run_backtest_with_equity(
@@ -33,12 +32,11 @@ def run_backtest_with_equity(
     Run a backtest and return the equity curve (portfolio value over time).
     """
     from microstructure import MicrostructureConfig
-    from execution import calibrate_execution_params
+    from execution import load_execution_params
     from risk import VolatilityTargetSizer
 
     clean_path = prepare_csv(data_path, clean_path)
-    df = pd.read_csv(clean_path, parse_dates=["datetime"])
-    df = df.sort_values("datetime").set_index("datetime")
+    df = load_ohlcv_csv(clean_path)
 
     data_feed = bt.feeds.PandasData(dataname=df)
 
@@ -53,7 +51,7 @@ def run_backtest_with_equity(
         cerebro.addstrategy(strategy_class, **strategy_kwargs)
         # Add volatility sizer for enhanced
         if strategy_class == EnhancedSmaCross:
-            exec_params = calibrate_execution_params(df, high_col="High", low_col="Low")
+            exec_params = load_execution_params(clean_path, high_col="High", low_col="Low")
             cerebro.broker.setcommission(commission=exec_params.commission_perc)
             cerebro.broker.set_slippage_perc(exec_params.slippage_perc)
             cerebro.addsizer(
@@ -75,15 +73,12 @@ def run_backtest_with_equity(
     dates = list(time_returns.keys())
     returns = list(time_returns.values())
 
-    # Build equity curve from returns
-    equity = [cash]
-    for ret in returns:
-        if ret is not None:
-            equity.append(equity[-1] * (1 + ret))
-        else:
-            equity.append(equity[-1])
+    # Build equity curve from returns (missing returns count as flat)
+    rets = np.asarray(returns, dtype=np.float64)
+    rets[np.isnan(rets)] = 0.0
+    equity = cash * np.cumprod(1.0 + rets)
 
-    return dates, equity[1:]  # Remove initial cash value
+    return dates, equity.tolist()
 
 
 def plot_equity_curves(
@@ -97,7 +92,11 @@ def plot_equity_curves(
     Plot equity curves for baseline and enhanced strategies.
     Academic style chart with legend for ABNT/USP format.
     """
-    fig, ax = plt.subplots(figsize=(12, 6))
+    # Imported here so backtest workers never load matplotlib
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
 
     ax.plot(baseline_dates, baseline_equity, label="Baseline (SMA Cross)",
             color="#1f77b4", linewidth=1.5)
@@ -118,17 +117,22 @@ def plot_equity_curves(
              "Figura — Comparacao da evolucao do capital entre estrategia baseline e aprimorada.",
              ha='center', fontsize=9, style='italic')
 
-    plt.tight_layout()
+    fig.tight_layout()
 
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     fig.savefig(output_path, dpi=300, bbox_inches="tight")
     print(f"Saved equity curve comparison to {output_path}")
-    plt.close(fig)
 
 
-def main():
+def main(parallel: bool = False):
     """
     Run both backtests and generate comparison chart.
+
+    Args:
+        parallel: Run the two backtests in separate processes. Off by
+            default: each spawned worker re-imports pandas, Backtrader and
+            Numba (~0.7 s), far more than the backtests themselves cost on
+            a year of daily bars. Worth it only on long intraday files.
     """
     from microstructure import MicrostructureConfig
 
@@ -137,32 +141,40 @@ def main():
     enhanced_clean = "data/MES_2023_enhanced_clean.csv"
     cash = 100_000.0
 
-    print("=" * 50)
-    print("Running Baseline Backtest...")
-    print("=" * 50)
-    baseline_dates, baseline_equity = run_backtest_with_equity(
-        SmaCrossStrategy,
-        data_path,
-        baseline_clean,
-        cash=cash,
-    )
+    jobs = [
+        (SmaCrossStrategy, baseline_clean, None),
+        (
+            EnhancedSmaCross,
+            enhanced_clean,
+            {
+                "micro_cfg": MicrostructureConfig(
+                    min_volume_pct_avg=0.3,
+                    max_spread_pct=None,
+                    min_holding_period=1,
+                )
+            },
+        ),
+    ]
 
-    print("\n" + "=" * 50)
-    print("Running Enhanced Backtest...")
     print("=" * 50)
-    enhanced_dates, enhanced_equity = run_backtest_with_equity(
-        EnhancedSmaCross,
-        data_path,
-        enhanced_clean,
-        cash=cash,
-        strategy_kwargs={
-            "micro_cfg": MicrostructureConfig(
-                min_volume_pct_avg=0.3,
-                max_spread_pct=None,
-                min_holding_period=1,
-            )
-        },
-    )
+    print("Running Baseline and Enhanced Backtests...")
+    print("=" * 50)
+    if parallel:
+        # The two backtests share no state, so they can run side by side.
+        # "spawn" avoids forking a process that already imported Backtrader.
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=2, mp_context=ctx) as ex:
+            futures = [
+                ex.submit(run_backtest_with_equity, cls, data_path, clean, cash, kwargs)
+                for cls, clean, kwargs in jobs
+            ]
+            curves = [f.result() for f in futures]
+    else:
+        curves = [
+            run_backtest_with_equity(cls, data_path, clean, cash, kwargs)
+            for cls, clean, kwargs in jobs
+        ]
+    (baseline_dates, baseline_equity), (enhanced_dates, enhanced_equity) = curves
 
     print("\n" + "=" * 50)
     print("Generating Equity Curve Comparison...")
@@ -192,4 +204,10 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Compara as equity curves do baseline e do enhanced bot")
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Roda os dois backtests em processos separados (só compensa em arquivos longos)",
+    )
+    main(parallel=parser.parse_args().parallel)
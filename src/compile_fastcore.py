@@ -0,0 +1,42 @@
+# src/compile_fastcore.py
+"""
+Compila ahead-of-time (numba.pycc) os kernels de fastcore.py.
+
+Gera o módulo de extensão `_fastcore_aot` ao lado deste arquivo;
+fastcore.py passa a importá-lo no lugar da versão JIT, evitando
+a compilação a cada interpretador novo (ex.: workers do compare.py).
+
+Uso:
+    python src/compile_fastcore.py
+"""
+from pathlib import Path
+
+from numba.pycc import CC
+
+import fastcore
+
+cc = CC("_fastcore_aot")
+cc.output_dir = str(Path(__file__).parent)
+
+# (close, open, cross, warmup, cash) -> matriz (N, 2)
+cc.export("sma_cross_simulate", "f8[:,:](f8[:], f8[:], f8[:], i8, f8)")(
+    fastcore._sma_cross_simulate
+)
+# (closes, out) -> (soma, soma dos quadrados) dos retornos
+cc.export("return_moments", "UniTuple(f8, 2)(f8[:], f8[:])")(
+    fastcore._return_moments
+)
+
+
+# hash do fastcore.py compilado; na importação, o fastcore compara com o
+# próprio arquivo e cai para o JIT se o .so estiver desatualizado
+SOURCE_HASH = fastcore._source_hash()
+
+
+@cc.export("source_hash", "i8()")
+def source_hash():
+    return SOURCE_HASH
+
+
+if __name__ == "__main__":
+    cc.compile()
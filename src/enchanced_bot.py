@@ -3,15 +3,14 @@ import argparse
 from pathlib import Path
 
 import backtrader as bt
-import pandas as pd
 
-from execution import calibrate_execution_params
+from execution import load_execution_params
+from fastcore import fast_crossover
 from microstructure import MicrostructureStrategy, MicrostructureConfig
 from risk import VolatilityTargetSizer
 
-from utils import prepare_csv
+from utils import load_ohlcv_csv, prepare_csv
 from metrics import compute_metrics
-from plotting import plot_candlestick_with_trades
 
 DEFAULT_RAW_DATA = Path("data") / "MES_2023.csv"
 DEFAULT_CLEAN_DATA = Path("data") / "MES_2023_clean.csv"
@@ -35,17 +34,18 @@ class EnhancedSmaCross(MicrostructureStrategy):
     def __init__(self):
         super().__init__()
 
-        self.sma_fast = bt.indicators.SimpleMovingAverage(
-            self.data.close, period=self.p.fast_period
-        )
-        self.sma_slow = bt.indicators.SimpleMovingAverage(
-            self.data.close, period=self.p.slow_period
-        )
-
-        self.crossover = bt.indicators.CrossOver(self.sma_fast, self.sma_slow)
+        # O cruzamento das médias é pré-calculado em start(); sem
+        # indicadores, o aquecimento das SMAs é tratado no next()
+        self._warmup = max(self.p.fast_period, self.p.slow_period)
         self.trades = []  # Track trades for plotting
         self.equity_curve = []  # Track portfolio value for metrics
 
+    def start(self):
+        super().start()
+        self._cross = fast_crossover(
+            self.data.close.array, self.p.fast_period, self.p.slow_period
+        )
+
     def notify_trade(self, trade):
         if trade.justopened:
             trade_type = 'buy' if trade.size > 0 else 'sell'
@@ -56,6 +56,9 @@ class EnhancedSmaCross(MicrostructureStrategy):
             })
 
     def next(self):
+        if len(self) <= self._warmup:
+            return
+
         # Track equity curve
         self.equity_curve.append(self.broker.getvalue())
 
@@ -65,35 +68,23 @@ class EnhancedSmaCross(MicrostructureStrategy):
         if not self.micro_ok():
             return
 
-        
+        crossover = self._cross[len(self) - 1]
         if not self.position:  # sem posição
-            if self.crossover > 0:
+            if crossover > 0:
                 self.buy()   # entra long
-            elif self.crossover < 0:
+            elif crossover < 0:
                 self.sell()  # entra short
         else:
             
-            if self.crossover > 0 and self.position.size < 0:
+            if crossover > 0 and self.position.size < 0:
                 self.close()
                 self.buy()
-            elif self.crossover < 0 and self.position.size > 0:
+            elif crossover < 0 and self.position.size > 0:
                 self.close()
                 self.sell()
 
 
 
-def load_ohlcv_csv(path: str | Path) -> pd.DataFrame:
-    """
-    Lê o CSV limpo gerado pelo prepare_csv, que tem colunas:
-    datetime, Open, High, Low, Close, Volume
-    """
-    df = pd.read_csv(path, parse_dates=["datetime"])
-    df = df.sort_values("datetime").set_index("datetime")
-    return df
-
-
-
-
 def run_backtest(
     data_path: str | Path = DEFAULT_RAW_DATA,
     cash: float = 100_000.0,
@@ -108,7 +99,7 @@ def run_backtest(
     df = load_ohlcv_csv(clean_path)
 
     # 3) Calibra parâmetros de execução (spread/slippage)
-    exec_params = calibrate_execution_params(df, high_col="High", low_col="Low")
+    exec_params = load_execution_params(clean_path, high_col="High", low_col="Low")
 
     # 4) Cria o feed de dados para o Backtrader
     data_feed = bt.feeds.PandasData(dataname=df)
@@ -148,18 +139,21 @@ def run_backtest(
     results = cerebro.run()
     strat = results[0]
 
-    # Generate clean academic chart
-    out_path = Path(out_dir)
-    out_path.mkdir(parents=True, exist_ok=True)
-
     # Reset index for plotting (need datetime as column)
     df_plot = df.reset_index()
-    plot_candlestick_with_trades(
-        df=df_plot,
-        trades=strat.trades,
-        title="Aprimorado: SMA + Microestrutura + Vol. Targeting",
-        output_path=str(out_path / "enhanced_candlestick.png"),
-    )
+
+    if plot:
+        # Generate clean academic chart (matplotlib só é carregado aqui)
+        from plotting import plot_candlestick_with_trades
+
+        out_path = Path(out_dir)
+        out_path.mkdir(parents=True, exist_ok=True)
+        plot_candlestick_with_trades(
+            df=df_plot,
+            trades=strat.trades,
+            title="Aprimorado: SMA + Microestrutura + Vol. Targeting",
+            output_path=str(out_path / "enhanced_candlestick.png"),
+        )
 
     # 5) Gera metrics.csv no mesmo formato do baseline, mas em results/enhanced
     compute_metrics(df_plot, results, out_dir=str(out_dir), equity_curve=strat.equity_curve)
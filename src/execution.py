@@ -1,17 +1,22 @@
 # src/execution.py
 from __future__ import annotations
 
-from dataclasses import dataclass
+import functools
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
 from typing import Optional
 
 import numpy as np
 import pandas as pd
 
 
-@dataclass
+@dataclass(frozen=True)
 class ExecutionParams:
     """
     Parâmetros de execução calibrados a partir do spread estimado.
+    Imutável: a mesma instância é compartilhada pelo cache.
 
     - mean_spread_pct: spread médio (%) baseado em High/Low
     - half_spread_pct: metade do spread (assumindo bid/ask simétricos)
@@ -40,13 +45,14 @@ def estimate_highlow_spread(
     - Depois você pode substituir por um estimador mais sofisticado
       (ex: Corwin & Schultz) mantendo a mesma assinatura.
     """
-    h = df[high_col].astype(float)
-    l = df[low_col].astype(float)
+    h = df[high_col].to_numpy(dtype=np.float64)
+    l = df[low_col].to_numpy(dtype=np.float64)
 
-    avg = (h + l) / 2.0
-    spread = (h - l) / avg
-    spread = spread.replace([np.inf, -np.inf], np.nan)
-    return spread
+    # (H - L) / ((H + L) / 2) == 2 (H - L) / (H + L); divisão só onde H + L > 0
+    total = h + l
+    spread = np.full(total.shape, np.nan)
+    np.divide(2.0 * (h - l), total, out=spread, where=total > 0)
+    return pd.Series(spread, index=df.index)
 
 
 def calibrate_execution_params(
@@ -77,3 +83,71 @@ def calibrate_execution_params(
         slippage_perc=slippage_perc,
         commission_perc=commission_perc,
     )
+
+
+def load_execution_params(
+    csv_path: str | Path,
+    high_col: str = "High",
+    low_col: str = "Low",
+    commission_perc: float = 0.0,
+    slippage_multiplier: float = 0.5,
+) -> ExecutionParams:
+    """
+    Mesmo que `calibrate_execution_params`, mas a partir do CSV limpo e com cache.
+
+    - em memória: lru_cache chaveado por (caminho, mtime, parâmetros)
+    - em disco: JSON ao lado do CSV (`<csv>.exec.json`), reaproveitado
+      enquanto o CSV não mudar
+    """
+    csv_path = os.fspath(csv_path)
+    return _cached_execution_params(
+        csv_path,
+        os.path.getmtime(csv_path),
+        high_col,
+        low_col,
+        commission_perc,
+        slippage_multiplier,
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_execution_params(
+    csv_path: str,
+    mtime: float,
+    high_col: str,
+    low_col: str,
+    commission_perc: float,
+    slippage_multiplier: float,
+) -> ExecutionParams:
+    sidecar = Path(csv_path + ".exec.json")
+    key = {
+        "mtime": mtime,
+        "high_col": high_col,
+        "low_col": low_col,
+        "commission_perc": commission_perc,
+        "slippage_multiplier": slippage_multiplier,
+    }
+
+    if sidecar.exists():
+        # sidecar truncado/corrompido (ex.: escrita interrompida) conta
+        # como cache miss: recalcula e regrava
+        try:
+            cached = json.loads(sidecar.read_text())
+            if cached.get("key") == key:
+                return ExecutionParams(**cached["params"])
+        except (json.JSONDecodeError, KeyError, TypeError, AttributeError):
+            pass
+
+    df = pd.read_csv(csv_path, usecols=[high_col, low_col])
+    params = calibrate_execution_params(
+        df,
+        high_col=high_col,
+        low_col=low_col,
+        commission_perc=commission_perc,
+        slippage_multiplier=slippage_multiplier,
+    )
+    # grava em arquivo temporário e troca de uma vez (atômico)
+    tmp = sidecar.with_name(sidecar.name + ".tmp")
+    tmp.write_text(json.dumps({"key": key, "params": asdict(params)}))
+    os.replace(tmp, sidecar)
+    return params
@@ -0,0 +1,193 @@
+# src/fastcore.py
+"""
+Núcleo numérico do SMA crossover, compilado com Numba quando disponível.
+
+Reproduz a semântica do SmaCrossStrategy rodando no Backtrader:
+
+- cruzamento pela "última diferença não nula" (igual ao bt.ind.CrossOver)
+- ordens a mercado de 1 contrato, executadas na abertura da barra seguinte
+- equity registrada no fechamento de cada barra em que o next() rodaria
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    import talib
+except ImportError:  # TA-Lib é opcional: soma cada janela com NumPy
+    talib = None
+
+
+def rolling_mean(values, window):
+    """
+    Média móvel simples via soma acumulada: (csum[W:] - csum[:-W]) / W.
+
+    O resultado fica alinhado ao índice das barras, com NaN
+    nas `window - 1` primeiras posições.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    csum = np.empty(values.shape[0] + 1)
+    csum[0] = 0.0
+    np.cumsum(values, out=csum[1:])
+
+    out = np.full(values.shape[0], np.nan)
+    out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+def last_nonzero(values):
+    """
+    Propaga para frente o último valor != 0 (zeros iniciais continuam 0).
+    """
+    last = np.where(values != 0, np.arange(values.shape[0]), 0)
+    np.maximum.accumulate(last, out=last)
+    return values[last]
+
+
+def _sma_sign(close, j, fast_p, slow_p):
+    """
+    Sinal exato de SMA(fast) - SMA(slow) na barra `j`, com as somas
+    feitas por math.fsum como no bt.ind.SMA.
+    """
+    d = (math.fsum(close[j - fast_p + 1:j + 1]) / fast_p
+         - math.fsum(close[j - slow_p + 1:j + 1]) / slow_p)
+    return float((d > 0) - (d < 0))
+
+
+def fast_crossover(close, fast_p, slow_p):
+    """
+    Equivalente vetorizado de bt.ind.CrossOver(SMA(fast), SMA(slow)).
+
+    Retorna +1 (cruzou para cima), -1 (cruzou para baixo) ou 0 por barra.
+    Como no Backtrader, o "antes" é a última diferença não nula, então
+    um empate entre as médias não gera sinal espúrio.
+
+    As médias vêm do talib.SMA (laço em C) quando instalado; senão cada
+    janela é somada do zero com NumPy. Só o sinal da diferença importa:
+    onde ela fica dentro da cota de erro de arredondamento, o sinal é
+    refeito com math.fsum, igual ao Backtrader, e empates exatos dão 0.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = close.shape[0]
+    warmup = max(fast_p, slow_p) - 1
+    sig = np.zeros(n)
+
+    if n > warmup:
+        # termos da cota de erro: somas das janelas + arredondamento do bt.ind.SMA
+        err_terms = fast_p + slow_p + 4
+        if talib is not None and np.isfinite(close).all():
+            fast = talib.SMA(close, timeperiod=fast_p)[warmup:]
+            slow = talib.SMA(close, timeperiod=slow_p)[warmup:]
+            # a soma corrente do TA-Lib (+ novo - antigo) acumula erro a
+            # cada barra; um NaN a contaminaria até o fim, daí o isfinite
+            err_terms += 4 * n
+        else:
+            fast = sliding_window_view(close, fast_p).sum(axis=1)[warmup - fast_p + 1:] / fast_p
+            slow = sliding_window_view(close, slow_p).sum(axis=1)[warmup - slow_p + 1:] / slow_p
+        diff = fast - slow
+        sig[warmup:] = np.sign(diff)
+
+        tol = 2.0 * err_terms * np.finfo(np.float64).eps * np.nanmax(np.abs(close))
+        for i in np.flatnonzero(np.abs(diff) <= tol):
+            sig[warmup + i] = _sma_sign(close, warmup + i, fast_p, slow_p)
+
+    sig = np.nan_to_num(sig)
+
+    # propaga o último sinal != 0 (NonZeroDifference)
+    nzd = last_nonzero(sig)
+
+    cross = np.zeros_like(sig)
+    cross[1:] = sig[1:] * (nzd[:-1] == -sig[1:])
+    return cross
+
+
+# Posição alvo por (posição atual, sinal do cruzamento), ambos em -1..1:
+# flat entra no lado do cruzamento; posição aberta só vira no cruzamento
+# contrário (close + ordem nova), senão é mantida.
+_TARGET_POS = np.array([
+    [-1.0, -1.0, 1.0],  # vendido
+    [-1.0, 0.0, 1.0],   # zerado
+    [-1.0, 1.0, 1.0],   # comprado
+])
+
+
+def _sma_cross_simulate(close, open_, cross, warmup, cash):
+    """
+    Simula o SMA crossover em um único passe O(N).
+
+    O sinal vem pronto de `fast_crossover` (o mesmo array usado pelo
+    SmaCrossStrategy e pelo backtest vetorizado), então os motores
+    não têm como divergir no cruzamento; o kernel só faz a execução.
+
+    Retorna uma matriz (N, 2):
+    - coluna 0: valor do portfólio no fechamento (NaN no aquecimento)
+    - coluna 1: posição em carteira após as execuções da barra
+    """
+    n = close.shape[0]
+    out = np.full((n, 2), np.nan)
+
+    pos = 0.0
+    pending = 0.0
+
+    for i in range(n):
+        # ordens do candle anterior executam na abertura
+        if pending != 0.0:
+            cash -= pending * open_[i]
+            pos += pending
+            pending = 0.0
+        out[i, 1] = pos
+
+        if i < warmup:
+            continue
+
+        out[i, 0] = cash + pos * close[i]
+
+        pending = _TARGET_POS[int(pos) + 1, int(cross[i]) + 1] - pos
+
+    return out
+
+
+def _return_moments(closes, out):
+    """
+    Escreve em `out` os log-retornos de `closes`
+    (len(closes) - 1 valores) e devolve, no mesmo passe,
+    (soma, soma dos quadrados) desses retornos.
+    """
+    total = 0.0
+    total_sq = 0.0
+    for i in range(1, closes.shape[0]):
+        r = np.log(closes[i] / closes[i - 1])
+        out[i - 1] = r
+        total += r
+        total_sq += r * r
+    return total, total_sq
+
+
+def _source_hash() -> int:
+    """sha256 deste arquivo, truncado para caber num int64."""
+    with open(__file__, "rb") as f:
+        return int(hashlib.sha256(f.read()).hexdigest()[:15], 16)
+
+
+try:
+    # versão ahead-of-time, gerada por `python src/compile_fastcore.py`;
+    # importa sem custo de compilação (nem import do numba) em cada
+    # processo novo
+    from _fastcore_aot import return_moments, sma_cross_simulate, source_hash
+
+    # .so compilado de outra versão deste arquivo: usa o JIT
+    if source_hash() != _source_hash():
+        raise ImportError("_fastcore_aot desatualizado; rode src/compile_fastcore.py")
+except ImportError:
+    try:
+        from numba import njit
+    except ImportError:  # numba é opcional: cai para Python puro
+        def njit(*args, **kwargs):
+            return lambda func: func
+
+    sma_cross_simulate = njit(cache=True)(_sma_cross_simulate)
+    return_moments = njit(cache=True)(_return_moments)
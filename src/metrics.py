@@ -3,55 +3,61 @@ import pandas as pd
 import os
 
 
+def _sample_std(x) -> float:
+    """Desvio-padrão amostral (ddof=1); NaN com menos de 2 pontos, como no pandas."""
+    return float(x.std(ddof=1)) if x.size > 1 else np.nan
+
+
 def compute_metrics(df, results, out_dir="results", equity_curve=None):
     """
     Compute trading metrics from the strategy's equity curve.
 
     Args:
         df: DataFrame with price data (used only if equity_curve is None)
-        results: Backtrader results list
+        results: Backtrader results list (None for the non-Cerebro engines)
         out_dir: Output directory for metrics.csv
         equity_curve: List of portfolio values over time (from strategy)
     """
 
     if equity_curve is not None and len(equity_curve) > 1:
         # Use actual equity curve from the robot
-        equity = pd.Series(equity_curve)
-        returns = equity.pct_change().dropna()
+        eq = np.ascontiguousarray(equity_curve, dtype=np.float64)
+        returns = (eq[1:] - eq[:-1]) / eq[:-1]
     else:
         # Fallback: try to get from backtrader analyzers
-        strat = results[0]
+        strat = results[0] if results else None
         if hasattr(strat, 'analyzers') and hasattr(strat.analyzers, 'timereturn'):
             time_returns = strat.analyzers.timereturn.get_analysis()
-            returns = pd.Series(list(time_returns.values())).dropna()
+            returns = np.asarray(list(time_returns.values()), dtype=np.float64)
+            returns = returns[~np.isnan(returns)]
         else:
             # Last resort: use asset returns (not ideal)
-            returns = df["Close"].pct_change().dropna()
+            close = df["Close"].to_numpy(dtype=np.float64)
+            returns = (close[1:] - close[:-1]) / close[:-1]
 
-    # Calculate metrics
-    mean_ret = returns.mean()
-    std_ret = returns.std()
+    # Calculate metrics (NaN on empty/single-return series, like pandas)
+    mean_ret = float(returns.mean()) if returns.size else np.nan
+    std_ret = _sample_std(returns)
 
     # Sharpe Ratio (annualized)
     sharpe = (mean_ret / std_ret) * np.sqrt(252) if std_ret > 0 else 0
 
     # Sortino Ratio (annualized, using downside deviation)
     downside_returns = returns[returns < 0]
-    downside_std = downside_returns.std() if len(downside_returns) > 0 else std_ret
+    downside_std = _sample_std(downside_returns) if len(downside_returns) > 0 else std_ret
     sortino = (mean_ret / downside_std) * np.sqrt(252) if downside_std > 0 else 0
 
     # Max Drawdown from equity curve
     if equity_curve is not None and len(equity_curve) > 1:
-        equity = pd.Series(equity_curve)
-        rolling_max = equity.cummax()
-        drawdown = (equity - rolling_max) / rolling_max
-        max_dd = drawdown.min()
+        rolling_max = np.maximum.accumulate(eq)
+        max_dd = float(((eq - rolling_max) / rolling_max).min())
+    elif returns.size == 0:
+        max_dd = np.nan
     else:
-        # Approximate from returns
-        cumulative = (1 + returns).cumprod()
-        rolling_max = cumulative.cummax()
-        drawdown = (cumulative - rolling_max) / rolling_max
-        max_dd = drawdown.min()
+        # Approximate from returns, in log space (stable on long series)
+        clog = np.cumsum(np.log1p(returns))
+        dd_log = clog - np.maximum.accumulate(clog)
+        max_dd = float(np.expm1(dd_log.min()))
 
     # Annualized Return
     annualized_return = mean_ret * 252
@@ -6,6 +6,8 @@ from typing import Optional
 
 import backtrader as bt
 
+from fastcore import rolling_mean
+
 
 @dataclass
 class MicrostructureConfig:
@@ -39,10 +41,21 @@ class MicrostructureStrategy(bt.Strategy):
         ("micro_cfg", MicrostructureConfig()),
     )
 
+    vol_ma_period = 20
+
     def __init__(self):
-        self.vol_ma = bt.indicators.SimpleMovingAverage(self.data.volume, period=20)
+        # start() lê as séries inteiras do feed (volume, close nas subclasses)
+        if not self.data.buflen():
+            raise ValueError(
+                f"{type(self).__name__} requer dados pré-carregados: use "
+                "bt.Cerebro(preload=True) (o padrão)"
+            )
         self._bars_since_trade = 0
 
+    def start(self):
+        # com preload, o feed já está inteiro em memória neste ponto.
+        # As primeiras barras ficam NaN e _liquidity_ok as recusa.
+        self._vol_ma_arr = rolling_mean(self.data.volume.array, self.vol_ma_period)
 
     def notify_trade(self, trade):
         if trade.isclosed:
@@ -55,10 +68,11 @@ class MicrostructureStrategy(bt.Strategy):
         """
         True se o volume atual é razoável comparado à média de volume.
         """
-        if self.vol_ma[0] == 0:
+        vol_ma = self._vol_ma_arr[len(self) - 1]
+        if not vol_ma > 0:
             return False
 
-        vol_ratio = self.data.volume[0] / self.vol_ma[0]
+        vol_ratio = self.data.volume[0] / vol_ma
         return vol_ratio >= self.p.micro_cfg.min_volume_pct_avg
 
     def _holding_period_ok(self) -> bool:
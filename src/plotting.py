@@ -3,13 +3,61 @@
 Clean academic-style charts for TCC USP.
 Simple price chart + SMA + trade markers.
 """
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
 import pandas as pd
 import numpy as np
 
+from fastcore import rolling_mean
+
+# Long series (fill_between, lines, markers) are rasterized; axes, text
+# and legend stay vector in PDF/SVG output.
+SAVE_DPI = 150
+
+# Pillow options per format: PNG at zlib level 3 (much faster than the
+# default, nearly the same file size); WebP is smaller and faster still.
+# Other formats (PDF, SVG) don't go through Pillow.
+_PIL_KWARGS = {
+    '.png': {'optimize': False, 'compress_level': 3},
+    '.webp': {'quality': 90, 'method': 4},
+}
+
+# Formatters/locator built once and reused by every chart
+# (set_major_* rebinds them to the current axis; none keeps state between uses)
+_MONTH_FMT = mdates.DateFormatter('%b/%Y')
+_MONTH_LOC = mdates.MonthLocator(interval=2)
+_DOLLAR_FMT = FuncFormatter(lambda x, p: f'${x:,.0f}')
+
+# Figure/axes reused across calls (parameter sweeps), one pair per
+# figsize; the axes are reset with ax.clear() before each use.
+_FIG_CACHE = {}
+
+
+def _get_axes(figsize):
+    entry = _FIG_CACHE.get(figsize)
+    if entry is None:
+        fig = Figure(figsize=figsize)
+        entry = _FIG_CACHE[figsize] = (fig, fig.subplots())
+    fig, ax = entry
+    ax.clear()
+    return fig, ax
+
+
+def _savefig(fig, output_path):
+    """Save the figure; the extension of `output_path` picks the format."""
+    kwargs = {}
+    pil_kwargs = _PIL_KWARGS.get(os.path.splitext(str(output_path))[1].lower())
+    if pil_kwargs is not None:
+        kwargs['pil_kwargs'] = pil_kwargs
+    fig.savefig(output_path, dpi=SAVE_DPI, bbox_inches='tight', facecolor='white', **kwargs)
+
 
 def plot_candlestick_with_trades(
     df: pd.DataFrame,
@@ -29,45 +77,56 @@ def plot_candlestick_with_trades(
         output_path: Where to save the PNG
         sma_short: Short SMA period
         sma_long: Long SMA period
-    """
-    # Prepare data
-    df = df.copy()
-    df['datetime'] = pd.to_datetime(df['datetime'])
-    df = df.sort_values('datetime').reset_index(drop=True)
 
-    # Calculate SMAs
-    df['SMA10'] = df['Close'].rolling(window=sma_short).mean()
-    df['SMA20'] = df['Close'].rolling(window=sma_long).mean()
-
-    # Create figure
-    fig, ax = plt.subplots(figsize=(14, 7))
-
-    # Plot candlesticks manually (simple version - just use close price line + range)
-    dates = df['datetime']
+    Returns:
+        output_path
+    """
+    # Prepare data as NumPy arrays (no copy, caller's DataFrame left untouched)
+    dt = pd.to_datetime(df['datetime'].to_numpy())
+    dates = dt.to_numpy()
+    low = df['Low'].to_numpy()
+    high = df['High'].to_numpy()
+    close = df['Close'].to_numpy(dtype=np.float64)
+    # Clean data is already chronological: only sort when needed
+    if not dt.is_monotonic_increasing:
+        order = np.argsort(dates, kind='mergesort')
+        dates, low, high, close = dates[order], low[order], high[order], close[order]
+
+    # Calculate SMAs (cumulative-sum trick, one pass per average)
+    sma_short_arr = rolling_mean(close, sma_short)
+    sma_long_arr = rolling_mean(close, sma_long)
+
+    # Create figure (object-oriented API: no pyplot global state to clean up)
+    fig, ax = _get_axes((14, 7))
 
     # Plot price as a line with high-low range shading
-    ax.fill_between(dates, df['Low'], df['High'], alpha=0.3, color='gray', label='_nolegend_')
-    ax.plot(dates, df['Close'], color='black', linewidth=1, label='Preço de Fechamento')
+    ax.fill_between(dates, low, high, alpha=0.3, color='gray', label='_nolegend_',
+                    rasterized=True)
+    ax.plot(dates, close, color='black', linewidth=1, label='Preço de Fechamento',
+            rasterized=True)
 
     # Plot SMAs
-    ax.plot(dates, df['SMA10'], color='#2E86AB', linewidth=1.5, label=f'MMS({sma_short})')
-    ax.plot(dates, df['SMA20'], color='#E94F37', linewidth=1.5, label=f'MMS({sma_long})')
-
-    # Plot trades
-    buys = [t for t in trades if t['type'] == 'buy']
-    sells = [t for t in trades if t['type'] == 'sell']
-
-    if buys:
-        buy_dates = [t['date'] for t in buys]
-        buy_prices = [t['price'] for t in buys]
-        ax.scatter(buy_dates, buy_prices, marker='^', color='green', s=100,
-                   zorder=5, label='Compra')
-
-    if sells:
-        sell_dates = [t['date'] for t in sells]
-        sell_prices = [t['price'] for t in sells]
-        ax.scatter(sell_dates, sell_prices, marker='v', color='red', s=100,
-                   zorder=5, label='Venda')
+    ax.plot(dates, sma_short_arr, color='#2E86AB', linewidth=1.5, label=f'MMS({sma_short})',
+            rasterized=True)
+    ax.plot(dates, sma_long_arr, color='#E94F37', linewidth=1.5, label=f'MMS({sma_long})',
+            rasterized=True)
+
+    # Plot trades (arrays filled straight from the dicts, split by boolean masks)
+    if trades:
+        n = len(trades)
+        trade_types = np.fromiter((t['type'] for t in trades), dtype='U4', count=n)
+        trade_dates = np.fromiter((t['date'] for t in trades), dtype='datetime64[ns]', count=n)
+        trade_prices = np.fromiter((t['price'] for t in trades), dtype=np.float64, count=n)
+        buy_mask = trade_types == 'buy'
+        sell_mask = trade_types == 'sell'
+
+        if buy_mask.any():
+            ax.scatter(trade_dates[buy_mask], trade_prices[buy_mask], marker='^',
+                       color='green', s=100, zorder=5, label='Compra', rasterized=True)
+
+        if sell_mask.any():
+            ax.scatter(trade_dates[sell_mask], trade_prices[sell_mask], marker='v',
+                       color='red', s=100, zorder=5, label='Venda', rasterized=True)
 
     # Formatting
     ax.set_xlabel('Data', fontsize=11)
@@ -77,14 +136,47 @@ def plot_candlestick_with_trades(
     ax.grid(True, alpha=0.3, linestyle='--')
 
     # Format x-axis dates
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b/%Y'))
-    ax.xaxis.set_major_locator(mdates.MonthLocator(interval=2))
+    ax.xaxis.set_major_formatter(_MONTH_FMT)
+    ax.xaxis.set_major_locator(_MONTH_LOC)
     fig.autofmt_xdate()
 
-    plt.tight_layout()
-    fig.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white')
+    fig.tight_layout()
+    _savefig(fig, output_path)
     print(f"Saved chart to {output_path}")
-    plt.close(fig)
+    return output_path
+
+
+def plot_candlestick_with_trades_worker(config: dict) -> str:
+    """
+    Picklable pool entry point: unpacks `config` into
+    plot_candlestick_with_trades and returns the saved path.
+    """
+    return plot_candlestick_with_trades(**config)
+
+
+def plot_candlestick_batch(configs, max_workers=None) -> list:
+    """
+    Render many candlestick charts (e.g. a parameter sweep) in parallel,
+    one process per core. Returns the saved paths in input order.
+
+    Args:
+        configs: Iterable of dicts with plot_candlestick_with_trades kwargs
+            (df, trades, output_path, ...); only picklable objects,
+            nothing from Backtrader
+        max_workers: Process count (default: one per core, capped
+            by the number of charts)
+    """
+    configs = list(configs)
+    if max_workers is None:
+        max_workers = min(len(configs), os.cpu_count() or 1)
+    if max_workers <= 1:
+        return [plot_candlestick_with_trades_worker(c) for c in configs]
+
+    # "spawn": callers have usually loaded Polars through utils, and its
+    # thread pool can deadlock in a forked child.
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as ex:
+        return list(ex.map(plot_candlestick_with_trades_worker, configs))
 
 
 def plot_equity_comparison(
@@ -98,12 +190,14 @@ def plot_equity_comparison(
     """
     Plot equity curves for baseline vs enhanced - clean academic style.
     """
-    fig, ax = plt.subplots(figsize=(12, 6))
+    fig, ax = _get_axes((12, 6))
 
     ax.plot(baseline_dates, baseline_equity,
-            color='#2E86AB', linewidth=1.5, label='Baseline (SMA Cross)')
+            color='#2E86AB', linewidth=1.5, label='Baseline (SMA Cross)',
+            rasterized=True)
     ax.plot(enhanced_dates, enhanced_equity,
-            color='#E94F37', linewidth=1.5, label='Aprimorado (Microestrutura)')
+            color='#E94F37', linewidth=1.5, label='Aprimorado (Microestrutura)',
+            rasterized=True)
 
     # Add horizontal line at initial capital
     ax.axhline(y=initial_cash, color='gray', linestyle='--', alpha=0.5, label='Capital Inicial')
@@ -115,13 +209,12 @@ def plot_equity_comparison(
     ax.grid(True, alpha=0.3, linestyle='--')
 
     # Format y-axis with thousands separator
-    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
+    ax.yaxis.set_major_formatter(_DOLLAR_FMT)
 
     # Format x-axis
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b/%Y'))
+    ax.xaxis.set_major_formatter(_MONTH_FMT)
     fig.autofmt_xdate()
 
-    plt.tight_layout()
-    fig.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white')
+    fig.tight_layout()
+    _savefig(fig, output_path)
     print(f"Saved equity curve to {output_path}")
-    plt.close(fig)
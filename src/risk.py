@@ -3,6 +3,8 @@ import math
 import numpy as np
 import backtrader as bt
 
+from fastcore import return_moments
+
 
 class VolatilityTargetSizer(bt.Sizer):
     """
@@ -16,7 +18,7 @@ class VolatilityTargetSizer(bt.Sizer):
     - max_leverage: limite de alavancagem (exposição máxima)
     - contract_size: multiplicador do contrato futuro (ex: 50 p/ E-mini)
 
-    Aqui a volatilidade é estimada a partir dos retornos de
+    Aqui a volatilidade é estimada a partir dos log-retornos de
     fechamento dos últimos `lookback` candles.
     """
 
@@ -30,16 +32,59 @@ class VolatilityTargetSizer(bt.Sizer):
     )
 
     def __init__(self):
-        # Só pré-calculamos o fator de anualização
+        # Só pré-calculamos o fator de anualização e, já dobrado nele,
+        # o alvo: target_vol / (daily_vol * f) == (target_vol / f) / daily_vol
         self._ann_factor = math.sqrt(self.p.annualization)
+        self._target_times_inv_ann = self.p.target_vol / self._ann_factor
+
+        # últimos `lookback - 1` retornos (buffer circular, `_head` aponta
+        # o mais antigo) com soma e soma dos quadrados, atualizadas
+        # incrementalmente entre chamadas
+        self._rets = np.empty(max(self.p.lookback - 1, 0), dtype=np.float64)
+        self._head = 0
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._last_len = None  # len(data) na última atualização
+
+        # janela de fechamentos pré-alocada, reaproveitada a cada recálculo
+        self._close_buf = np.empty(self.p.lookback, dtype=np.float64)
+
+    def _update_moments(self, data):
+        """
+        Avança a janela de retornos até a barra atual.
+
+        O sizer só é chamado quando há ordem, então podem ter passado
+        várias barras: se o salto cobre a janela inteira, recalcula a
+        partir da fatia (kernel compilado, um passe); senão, entra um
+        retorno e sai o mais antigo por barra (O(1) cada).
+        """
+        n = len(data)
+        rets = self._rets
+        k = rets.shape[0]
+        if self._last_len is None or n - self._last_len >= k:
+            # get() devolve a fatia do array da linha, sem __getitem__ por barra
+            closes = self._close_buf
+            closes[:] = data.close.get(ago=0, size=self.p.lookback)
+            self._sum, self._sumsq = return_moments(closes, rets)
+            self._head = 0
+        else:
+            gap = n - self._last_len
+            closes = data.close.get(ago=0, size=gap + 1)
+            for i in range(1, gap + 1):
+                r = math.log(closes[i] / closes[i - 1])
+                old = rets[self._head]
+                rets[self._head] = r
+                self._head = (self._head + 1) % k
+                self._sum += r - old
+                self._sumsq += r * r - old * old
+        self._last_len = n
 
     # ----------------------------------------------------------
-    # helper para estimar a volatilidade anualizada
+    # helper para estimar a volatilidade (diária)
     # ----------------------------------------------------------
-    def _estimate_ann_vol(self, data) -> float | None:
+    def _estimate_daily_vol(self, data) -> float | None:
         """
-        Estima a volatilidade anualizada com base nos últimos
-        `lookback` fechamentos.
+        Desvio-padrão amostral dos log-retornos da janela (por barra).
 
         Retorna None se não houver dados suficientes.
         """
@@ -47,26 +92,16 @@ class VolatilityTargetSizer(bt.Sizer):
         if n <= self.p.lookback:
             return None
 
-        # Pegamos os últimos `lookback` preços de fechamento,
-        # incluindo o atual (índice 0) e voltando pra trás.
-        closes = []
-        # índices de -lookback+1 até 0 (por ex.: -19, ..., 0)
-        for i in range(-self.p.lookback + 1, 1):
-            closes.append(float(data.close[i]))
-
-        closes = np.array(closes, dtype=float)
-
-        # retornos percentuais
-        rets = np.diff(closes) / closes[:-1]
-        if len(rets) == 0:
+        # log-retornos dos últimos `lookback` fechamentos
+        k = self._rets.shape[0]
+        if k < 2:
             return None
+        self._update_moments(data)
 
-        daily_vol = np.nanstd(rets, ddof=1)
-        if daily_vol <= 0 or np.isnan(daily_vol):
+        var = (self._sumsq - self._sum * self._sum / k) / (k - 1)
+        if not var > 0:
             return None
-
-        ann_vol = daily_vol * self._ann_factor
-        return ann_vol
+        return math.sqrt(var)
 
     # ----------------------------------------------------------
     # método principal do sizer
@@ -77,25 +112,29 @@ class VolatilityTargetSizer(bt.Sizer):
         if price <= 0:
             return 0
 
-        # estima volatilidade anualizada
-        ann_vol = self._estimate_ann_vol(data)
-        if ann_vol is None or ann_vol <= 0 or np.isnan(ann_vol):
+        # checagens baratas antes de tocar na janela de volatilidade
+        equity = self.broker.getvalue()
+        if equity <= 0:
+            return 0
+
+        # cada contrato tem valor price * contract_size
+        contract_notional = price * self.p.contract_size
+        if contract_notional <= 0:
             return 0
 
-        equity = self.broker.getvalue()
+        # estima volatilidade diária (a anualização já está no alvo);
+        # None cobre janela curta, variância nula e NaN (var > 0 falha)
+        daily_vol = self._estimate_daily_vol(data)
+        if daily_vol is None:
+            return 0
 
-        # exposição alvo ~ target_vol / vol_realizada
-        raw_exposure = self.p.target_vol / ann_vol
+        # exposição alvo ~ target_vol / vol_realizada anualizada
+        raw_exposure = self._target_times_inv_ann / daily_vol
         exposure = max(0.0, min(self.p.max_leverage, raw_exposure))
 
         # valor nocional alvo do portfólio
         target_notional = equity * exposure
 
-        # cada contrato tem valor price * contract_size
-        contract_notional = price * self.p.contract_size
-        if contract_notional <= 0:
-            return 0
-
         size = int(target_notional / contract_notional)
 
         if size < self.p.min_size:
@@ -1,39 +1,197 @@
+import hashlib
+import numpy as np
 import pandas as pd
 import os
 
-import pandas as pd
-import os
+try:
+    import polars as pl  # leitor multithread, preferido quando instalado
+except ImportError:
+    pl = None
+
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"  # leitor multithread
+except ImportError:
+    CSV_ENGINE = "c"
+
+OHLCV_COLUMNS = ["datetime", "Open", "High", "Low", "Close", "Volume"]
+OHLCV_DTYPES = {
+    "Open": np.float32,
+    "High": np.float32,
+    "Low": np.float32,
+    "Close": np.float32,
+    "Volume": np.float32,
+}
+# tipos do CSV bruto lido pelo prepare_csv: float64 preserva os preços
+# do bruto dígito a dígito no CSV limpo (o float32 fica no load_ohlcv_csv)
+RAW_DTYPES = {
+    "Open": np.float64,
+    "High": np.float64,
+    "Low": np.float64,
+    "Close": np.float64,
+    "Volume": "Int64",
+}
+
+
+def load_ohlcv_csv(path) -> pd.DataFrame:
+    """
+    Lê o CSV limpo gerado pelo prepare_csv, que tem colunas:
+    datetime, Open, High, Low, Close, Volume
+
+    Tipos declarados (float32, sem inferência) e só as colunas usadas.
+    float32 é exato para preços em ticks de 0.25 e volumes < 2**24.
+    Usa polars quando instalado, senão pandas (engine pyarrow ou C).
+    """
+    if pl is not None:
+        return _load_ohlcv_csv_polars(path)
+
+    df = pd.read_csv(
+        path,
+        usecols=OHLCV_COLUMNS,
+        dtype=OHLCV_DTYPES,
+        parse_dates=["datetime"],
+        engine=CSV_ENGINE,
+    )
+    if not df["datetime"].is_monotonic_increasing:
+        df = df.sort_values("datetime", kind="mergesort")
+    return df.set_index("datetime")
+
+
+def _load_ohlcv_csv_polars(path) -> pd.DataFrame:
+    schema = {"datetime": pl.Datetime("ns")}
+    schema.update({c: pl.Float32 for c in OHLCV_DTYPES})
+    df = pl.read_csv(path, columns=OHLCV_COLUMNS, schema_overrides=schema).sort("datetime")
+
+    # monta o DataFrame do pandas direto dos arrays NumPy
+    # (to_pandas() exigiria pyarrow)
+    index = pd.DatetimeIndex(df["datetime"].to_numpy(), name="datetime")
+    return pd.DataFrame({c: df[c].to_numpy() for c in OHLCV_DTYPES}, index=index)
+
+
+def file_sha256(path, chunk_size=1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _clean_csv_is_fresh(input_path, output_path, raw_hash) -> bool:
+    """
+    O CSV limpo é reaproveitado se for mais novo que o bruto e se o
+    hash do bruto bater com o gravado em `<output>.sha256`
+    (mtime sozinho não é confiável em filesystems compartilhados).
+    """
+    hash_path = output_path + ".sha256"
+    if not (os.path.exists(output_path) and os.path.exists(hash_path)):
+        return False
+    if os.path.getmtime(output_path) < os.path.getmtime(input_path):
+        return False
+    with open(hash_path) as f:
+        return f.read().strip() == raw_hash
+
+
+def _read_raw_ohlcv(input_path, columns, date_col, skip) -> pd.DataFrame:
+    """
+    Leitura única do CSV bruto: só a data e o OHLCV, tipos declarados,
+    pulando as `skip` linhas logo abaixo do header.
+
+    Usa polars quando instalado, senão pandas com engine pyarrow ou C.
+    """
+    usecols = [date_col, "Open", "High", "Low", "Close", "Volume"]
+
+    if pl is not None:
+        return _read_raw_ohlcv_polars(input_path, columns, usecols, skip)
+
+    if CSV_ENGINE == "pyarrow":
+        # o engine pyarrow só aceita skiprows inteiro (conta o header) e
+        # troca os nomes ao combinar usecols com names: lê tudo e projeta
+        df = pd.read_csv(
+            input_path,
+            header=None,
+            names=list(columns),
+            skiprows=skip + 1,
+            parse_dates=[date_col],
+            dtype=RAW_DTYPES,
+            engine="pyarrow",
+        )
+        return df[usecols]
+
+    return pd.read_csv(
+        input_path,
+        usecols=usecols,
+        skiprows=range(1, skip + 1),
+        parse_dates=[date_col],
+        dtype=RAW_DTYPES,
+    )
+
+
+def _read_raw_ohlcv_polars(input_path, columns, usecols, skip) -> pd.DataFrame:
+    # seleção por posição: o polars não chama a coluna sem nome de "Unnamed: 0"
+    positions = sorted(columns.get_loc(c) for c in usecols)
+    df = pl.read_csv(
+        input_path,
+        columns=positions,
+        skip_rows_after_header=skip,
+        infer_schema=False,
+    )
+    df.columns = [columns[i] for i in positions]
+    df = df.with_columns(
+        pl.col("Open", "High", "Low", "Close").cast(pl.Float64),
+        pl.col("Volume").cast(pl.Int64),
+    ).drop_nulls()
+
+    date_col = usecols[0]
+    out = {date_col: pd.to_datetime(df[date_col].to_numpy())}
+    out.update({c: df[c].to_numpy() for c in usecols[1:]})
+    return pd.DataFrame(out)
+
 
 def prepare_csv(input_path="data/MES_2023.csv", output_path="data/MES_2023_clean.csv"):
+    raw_hash = file_sha256(input_path)
+    if _clean_csv_is_fresh(input_path, output_path, raw_hash):
+        print(f"✅ CSV limpo já atualizado: {output_path}")
+        return output_path
+
     print(f"🔧 Limpando dataset: {input_path}")
-    df = pd.read_csv(input_path)
 
-    if "Ticker" in df.columns:
-        df = df.drop(columns=["Ticker"])
+    # lê só o cabeçalho para decidir a coluna de data
+    columns = pd.read_csv(input_path, nrows=0).columns
 
-    if "Date" in df.columns:
-        df["datetime"] = pd.to_datetime(df["Date"])
-    elif "Date" not in df.columns and "Unnamed: 0" in df.columns:
-        df["datetime"] = pd.to_datetime(df["Unnamed: 0"])
-    elif "Price" in df.columns:  
-        df["datetime"] = pd.to_datetime(df["Price"], errors="coerce")
+    if "Date" in columns:
+        date_col = "Date"
+    elif "Unnamed: 0" in columns:
+        date_col = "Unnamed: 0"
+    elif "Price" in columns:
+        date_col = "Price"
     else:
         raise ValueError("Nenhuma coluna de data válida encontrada no CSV!")
 
-   
     possible_cols = ["Open", "High", "Low", "Close", "Volume"]
-    found_cols = [c for c in possible_cols if c in df.columns]
+    found_cols = [c for c in possible_cols if c in columns]
 
     if len(found_cols) < 5:
         print("⚠️ Algumas colunas faltando, detectando automaticamente...")
-        print("Colunas encontradas:", df.columns.tolist())
+        print("Colunas encontradas:", columns.tolist())
+
+    # CSVs do yfinance trazem linhas extras de cabeçalho ("Ticker", "Date")
+    # logo abaixo do header; sem preço numérico, elas quebrariam os dtypes
+    head = pd.read_csv(input_path, usecols=["Close"], nrows=8)
+    valid = pd.to_numeric(head["Close"], errors="coerce").notna().to_numpy()
+    skip = int(valid.argmax()) if valid.any() else 0
+
+    df_clean = _read_raw_ohlcv(input_path, columns, date_col, skip)
+    df_clean.rename(columns={date_col: "datetime"}, inplace=True)
 
-    df_clean = df[["datetime", "Open", "High", "Low", "Close", "Volume"]].copy()
+    df_clean = df_clean[["datetime", "Open", "High", "Low", "Close", "Volume"]]
     df_clean = df_clean.dropna()
-    df_clean = df_clean.sort_values("datetime")
+    if not df_clean["datetime"].is_monotonic_increasing:
+        df_clean = df_clean.sort_values("datetime", kind="mergesort")
 
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     df_clean.to_csv(output_path, index=False, date_format="%Y-%m-%d")
+    with open(output_path + ".sha256", "w") as f:
+        f.write(raw_hash + "\n")
 
     print(f"✅ CSV limpo salvo em: {output_path}")
     print(df_clean.head())
@@ -0,0 +1,51 @@
+# src/vector_backtest.py
+"""
+Backtest vetorizado (só NumPy, sem loop por barra) do SMA crossover.
+
+Com ordens de 1 contrato, sem sizer e sem custos, a posição do
+SmaCrossStrategy depende apenas do último cruzamento: fica zerada até o
+primeiro sinal e depois carrega o lado do cruzamento mais recente,
+executado na abertura da barra seguinte. Isso dispensa o event loop do
+Backtrader e dá a mesma equity do Cerebro e do fastcore.
+
+O bot aprimorado continua no Backtrader: o VolatilityTargetSizer e os
+filtros de microestrutura tornam a posição dependente do caminho.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from fastcore import fast_crossover, last_nonzero
+
+
+def sma_cross_vectorized(close, open_, fast_p, slow_p, cash):
+    """
+    Retorna (equity, position), ambos alinhados às barras:
+
+    - equity: valor do portfólio no fechamento (NaN no aquecimento)
+    - position: posição em carteira após as execuções da barra
+    """
+    close = np.asarray(close, dtype=np.float64)
+    open_ = np.asarray(open_, dtype=np.float64)
+
+    # lado do último cruzamento, executado na abertura seguinte
+    side = last_nonzero(fast_crossover(close, fast_p, slow_p))
+    position = np.zeros_like(close)
+    position[1:] = side[:-1]
+
+    # caixa: cada troca de posição é paga/recebida no preço de abertura
+    traded = np.diff(position, prepend=0.0)
+    cash_path = cash - np.cumsum(traded * open_)
+
+    equity = cash_path + position * close
+    equity[:max(fast_p, slow_p)] = np.nan
+    return equity, position
+
+
+def opened_trades(position):
+    """
+    Índices das barras em que um trade abre: a posição sai de zerada
+    ou troca de lado.
+    """
+    prev = np.concatenate(([0.0], position[:-1]))
+    return np.flatnonzero((position != 0) & (np.sign(position) != np.sign(prev)))